@@ -4,9 +4,153 @@ UDP Server (Python-only)
 - Listens on assigned port (50995) on linux-01.socs.uoguelph.ca.
 - Simulates loss via --drop-k OR --loss-prob (exactly one active).
 - Echoes JSON ACKs: { "seq": <int>, "server_recv_ts": <float> }.
-Allowed libs: argparse, json, random, socket, time, sys, signal
+- Optional --workers N forks N processes sharing the port via SO_REUSEPORT.
+  Worker i seeds its RNG with --seed + i, and the kernel decides which worker
+  gets a client, so the --loss-prob drop pattern for a given --seed is only
+  reproducible with --workers 1 (drop-k is unaffected).
+Allowed libs: argparse, ctypes, json, os, random, socket, sys, signal
 """
-import argparse, json, random, socket, time, sys, signal
+import argparse, ctypes, json, os, random, socket, sys, signal
+import _recvmmsg
+
+BATCH = 64  # datagrams drained per recvmmsg call
+PR_SET_PDEATHSIG = 1  # prctl(2) option: signal sent to this process when its parent dies
+ACK_FMT = b'{"seq":%d,"server_recv_ts":%d.%09d}'  # fixed ACK schema, no JSON encoder needed
+
+def parse_seq(buf, start, end):
+    """
+    Pull the integer "seq" out of the JSON datagram in buf[start:end] (None if absent).
+    Fast path: for the client's own layout, `{"seq":<int>,...}`, read the integer in
+    place without a full decode or a copy. It is only taken when "seq" is the first key,
+    the datagram ends with "}" and the value is a JSON integer literal; anything else
+    goes through json.loads exactly as before. The fields after seq are not validated.
+    """
+    if buf.startswith(b'{"seq":', start, end) and buf.endswith(b"}", start, end):
+        i = start + 7
+        j = buf.find(b",", i, end)
+        if j < 0:
+            j = end - 1
+        num = buf[i:j].strip()
+        digits = num[1:] if num[:1] == b"-" else num
+        # JSON integers: ASCII digits only, no "_" separators, no leading zeros
+        if digits.isdigit() and (digits[:1] != b"0" or len(digits) == 1):
+            return int(num)
+    try:
+        return int(json.loads(bytes(buf[start:end])).get("seq"))
+    except Exception:
+        return None
+
+def make_keep(drop_k, thresh):
+    """
+    Loss-model decision, picked once per run: keep(seq) is True to ACK, False to drop.
+    `thresh` is loss_prob scaled to 32 bits (see loss_threshold).
+    """
+    # Deterministic drop-k
+    if drop_k > 0:
+        def keep(seq):
+            return seq % drop_k != 0
+    # Bernoulli loss: integer compare, no float drawn per packet
+    elif thresh:
+        def keep(seq, getrandbits=random.getrandbits):
+            return getrandbits(32) >= thresh
+    else:
+        def keep(seq):
+            return True
+    return keep
+
+def process(buf, start, end, recv_sec, recv_nsec, keep):
+    """
+    Per-packet kernel: decode seq from buf[start:end], apply keep() from make_keep(),
+    encode the ACK. Returns (seq, ack); seq is None for malformed datagrams, ack is
+    None when dropped.
+    """
+    seq = parse_seq(buf, start, end)
+    if seq is None or not keep(seq):
+        return seq, None
+    return seq, ACK_FMT % (seq, recv_sec, recv_nsec)
+
+def loss_threshold(loss_prob):
+    """Scale a drop probability to a 32-bit threshold for random.getrandbits(32)."""
+    return int(loss_prob * (1 << 32))
+
+def _exit_with_parent(parent):
+    """Have the kernel SIGTERM this worker if the parent dies (Linux only, else a no-op)."""
+    try:
+        ctypes.CDLL("libc.so.6", use_errno=True).prctl(PR_SET_PDEATHSIG, signal.SIGTERM)
+    except (OSError, AttributeError):
+        return
+    # The parent may have died between fork() and prctl()
+    if os.getppid() != parent:
+        sys.exit(0)
+
+# Server loops. Exactly one loss model is active per run, so main() picks a loop
+# with that model's test inlined once instead of testing both models on every packet.
+# Everything the hot path touches is bound to a local first (LOAD_FAST instead of
+# global/attribute lookups per packet).
+# count[0] is the running recv_count, shared with the SIGINT summary.
+
+def _loop_none(rx, tx, count):
+    recv, length, stamp, add, flush = rx.recv, rx.length, rx.stamp, tx.add, tx.flush
+    buf, slot = rx.buf, rx.slot
+    parse, ack_fmt = parse_seq, ACK_FMT
+    while True:
+        n = recv()
+        count[0] += n
+        for i in range(n):
+            start = i * slot
+            seq = parse(buf, start, start + length(i))
+            if seq is not None:
+                recv_sec, recv_nsec = stamp(i)
+                add(rx, i, ack_fmt % (seq, recv_sec, recv_nsec))
+        flush()
+
+def _loop_dropk(rx, tx, count, k):
+    recv, length, stamp, add, flush = rx.recv, rx.length, rx.stamp, tx.add, tx.flush
+    buf, slot = rx.buf, rx.slot
+    parse, ack_fmt = parse_seq, ACK_FMT
+    while True:
+        n = recv()
+        count[0] += n
+        for i in range(n):
+            start = i * slot
+            seq = parse(buf, start, start + length(i))
+            if seq is not None and seq % k:
+                recv_sec, recv_nsec = stamp(i)
+                add(rx, i, ack_fmt % (seq, recv_sec, recv_nsec))
+        flush()
+
+def _loop_bernoulli(rx, tx, count, thresh):
+    recv, length, stamp, add, flush = rx.recv, rx.length, rx.stamp, tx.add, tx.flush
+    buf, slot = rx.buf, rx.slot
+    parse, ack_fmt = parse_seq, ACK_FMT
+    getrandbits = random.getrandbits
+    while True:
+        n = recv()
+        count[0] += n
+        for i in range(n):
+            start = i * slot
+            seq = parse(buf, start, start + length(i))
+            if seq is not None and getrandbits(32) >= thresh:
+                recv_sec, recv_nsec = stamp(i)
+                add(rx, i, ack_fmt % (seq, recv_sec, recv_nsec))
+        flush()
+
+def _loop_verbose(rx, tx, count, keep, drop_tag):
+    """Generic loop with per-packet prints; speed is moot once every packet is printed."""
+    while True:
+        n = rx.recv()
+        for i in range(n):
+            count[0] += 1
+            recv_sec, recv_nsec = rx.stamp(i)
+            start = i * rx.slot
+            seq, ack = process(rx.buf, start, start + rx.length(i), recv_sec, recv_nsec, keep)
+            if ack is None:
+                if seq is not None: print(f"[SERVER] {drop_tag} seq={seq}")
+                continue
+            tx.add(rx, i, ack)
+            print(f"[SERVER] ACK seq={seq} (recv_count={count[0]})")
+        # Dropped packets were never queued, so one flush covers the whole batch
+        tx.flush()
 
 def main():
     ap = argparse.ArgumentParser(description="UDP ACK server with optional loss models")
@@ -15,6 +159,10 @@ def main():
     ap.add_argument("--loss-prob", type=float, default=0.0, help="Bernoulli drop probability [0,1]")
     ap.add_argument("--drop-k", type=int, default=0, help="Drop every k-th packet (0=off)")
     ap.add_argument("--seed", type=int, default=32101211950, help="RNG seed for reproducibility")
+    ap.add_argument("--rcvbuf", type=int, default=12_582_912, help="SO_RCVBUF request in bytes (capped by net.core.rmem_max)")
+    ap.add_argument("--sndbuf", type=int, default=12_582_912, help="SO_SNDBUF request in bytes (capped by net.core.wmem_max)")
+    ap.add_argument("--workers", type=int, default=1, help="Server processes sharing the port (SO_REUSEPORT); "
+                    "--loss-prob runs are only reproducible from --seed with 1 worker")
     ap.add_argument("--verbose", action="store_true", help="Print per-packet events")
     args = ap.parse_args()
 
@@ -22,54 +170,88 @@ def main():
     if args.loss_prob > 0.0 and args.drop_k > 0:
         print("Use only one loss model at a time (--loss-prob OR --drop-k).", file=sys.stderr)
         sys.exit(1)
+    if args.workers < 1 or (args.workers > 1 and not hasattr(socket, "SO_REUSEPORT")):
+        print("--workers must be >= 1, and > 1 needs SO_REUSEPORT (Linux).", file=sys.stderr)
+        sys.exit(1)
+
+    # Fork before any socket exists; every worker binds its own SO_REUSEPORT socket and
+    # the kernel spreads incoming flows across them. Drop-k keys on seq, so it behaves the
+    # same in every worker. Each worker gets its own RNG stream (seed + index); which one a
+    # client lands on is up to the kernel's hash, so Bernoulli drops only repeat exactly
+    # for a given --seed with a single worker.
+    worker, children, parent = 0, [], os.getpid()
+    for w in range(1, args.workers):
+        pid = os.fork()
+        if pid == 0:
+            worker, children = w, []
+            _exit_with_parent(parent)
+            break
+        children.append(pid)
+    seed = args.seed + worker
+    tag = f"[SERVER w{worker}]" if args.workers > 1 else "[SERVER]"
 
-    random.seed(args.seed)
+    random.seed(seed)
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if args.workers > 1:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    # Large kernel buffers so bursts are not dropped before recvfrom sees them
+    # (those drops would show up as phantom loss in the study).
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, args.rcvbuf)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, args.sndbuf)
     sock.bind((args.host, args.port))
 
+    # Linux reports back double the size it granted (bookkeeping overhead); halve it so
+    # the comparison and the log show what was actually granted
+    scale = 2 if sys.platform.startswith("linux") else 1
+    rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF) // scale
+    sndbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF) // scale
+    print(f"{tag} Socket buffers: rcvbuf={rcvbuf} (requested {args.rcvbuf}), "
+          f"sndbuf={sndbuf} (requested {args.sndbuf})", file=sys.stderr)
+    if rcvbuf < args.rcvbuf or sndbuf < args.sndbuf:
+        print(f"{tag} Socket buffers capped by kernel; "
+              f"raise net.core.rmem_max / net.core.wmem_max to allow more.", file=sys.stderr)
+
     if args.verbose:
-        print(f"[SERVER] Listening on {args.host}:{args.port} | "
-              f"loss_prob={args.loss_prob} drop_k={args.drop_k} seed={args.seed}")
+        print(f"{tag} Listening on {args.host}:{args.port} | "
+              f"loss_prob={args.loss_prob} drop_k={args.drop_k} seed={seed} | "
+              f"rcvbuf={rcvbuf} sndbuf={sndbuf}")
 
-    recv_count = 0
+    count = [0]  # recv_count, updated by the server loop
+    rx = _recvmmsg.open_receiver(sock, BATCH)
+    tx = _recvmmsg.open_sender(sock)
 
     def _print_summary():
         model = "drop-k" if args.drop_k > 0 else ("bernoulli" if args.loss_prob > 0.0 else "none")
-        print(f"\n[SERVER] Summary: recv_count={recv_count}, loss_model={model}, "
-              f"k={args.drop_k}, p={args.loss_prob}, seed={args.seed}")
+        print(f"\n{tag} Summary: recv_count={count[0]}, loss_model={model}, "
+              f"k={args.drop_k}, p={args.loss_prob}, seed={seed}", flush=True)
 
-    def _sigint(*_):
+    def _shutdown(*_):
+        # Ctrl-C reaches every worker; ignore repeats so each summary prints once
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
         _print_summary()
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
         sys.exit(0)
 
-    signal.signal(signal.SIGINT, _sigint)
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
 
-    while True:
-        data, addr = sock.recvfrom(65535)
-        recv_ts = time.time()
-        recv_count += 1
-
-        try:
-            payload = json.loads(data.decode("utf-8"))
-            seq = int(payload.get("seq"))
-        except Exception:
-            continue
-
-        # Deterministic drop-k
-        if args.drop_k > 0 and seq % args.drop_k == 0:
-            if args.verbose: print(f"[SERVER] DROP-K seq={seq}")
-            continue
-
-        # Bernoulli loss
-        if args.loss_prob > 0.0 and random.random() < args.loss_prob:
-            if args.verbose: print(f"[SERVER] LOSS-PROB seq={seq}")
-            continue
-
-        ack = {"seq": seq, "server_recv_ts": recv_ts}
-        sock.sendto(json.dumps(ack, separators=(",", ":")).encode("utf-8"), addr)
-        if args.verbose:
-            print(f"[SERVER] ACK seq={seq} (recv_count={recv_count})")
+    thresh = loss_threshold(args.loss_prob)
+    if args.verbose:
+        _loop_verbose(rx, tx, count, make_keep(args.drop_k, thresh),
+                      "DROP-K" if args.drop_k > 0 else "LOSS-PROB")
+    elif args.drop_k > 0:
+        _loop_dropk(rx, tx, count, args.drop_k)
+    elif thresh:
+        _loop_bernoulli(rx, tx, count, thresh)
+    else:
+        _loop_none(rx, tx, count)
 
 if __name__ == "__main__":
     main()
@@ -2,13 +2,21 @@
 """
 UDP Client (Python-only)
 - Sends N JSON messages (seq 1..N) to linux-01.socs.uoguelph.ca:50995.
-- Measures RTT with time.perf_counter(), handles out-of-order ACKs.
+- Measures RTT with time.perf_counter_ns(), handles out-of-order ACKs.
 - Logs CSV: seq,send_ts,ack_ts,rtt_ms,outcome; prints JSON + human summary.
 - Now prints real-time RTT per ACK as soon as it is first observed.
 """
-import argparse, csv, json, random, socket, time, statistics
+import argparse, csv, json, random, socket, time
+from array import array
 
-def now_perf(): return time.perf_counter()
+# Outgoing message with a fixed schema: %-formatted bytes instead of a json.dumps per send
+MSG_FMT = b'{"seq":%d,"send_ts":%d.%09d,"msg":"Hello %d"}'
+
+# Per-seq state bits (LOGGED_ACKED: finalized with outcome ACKED)
+SEEN, ACKED, FINALIZED, LOGGED_ACKED = 1, 2, 4, 8
+
+def now_perf_ns(): return time.perf_counter_ns()
+def fmt_wall_ns(ns): return "%d.%06d" % divmod(ns // 1000, 1_000_000)
 def jitter_sleep(interval, jitter): time.sleep(interval * (1.0 + random.uniform(-jitter, jitter)))
 
 def main():
@@ -30,91 +38,101 @@ def main():
 
     fields = ["seq", "send_ts", "ack_ts", "rtt_ms", "outcome"]
     f = open(args.log_csv, "w", newline="", encoding="utf-8")
-    writer = csv.DictWriter(f, fieldnames=fields)
-    writer.writeheader()
+    writer = csv.writer(f)
+    writer.writerow(fields)
 
     sent_count = ack_count = 0
-    seen_seqs, send_perf, send_wall, ack_perf, ack_wall, finalized = set(), {}, {}, {}, {}, set()
+    # seq is dense in 1..N, so keep one array per field indexed by seq (struct of arrays)
+    # instead of a dict/set per field. Integer ns timestamps; RTT and wall-clock strings
+    # are only derived in finalize().
+    n1 = args.n + 1
+    send_perf_ns, send_wall_ns = array("q", [0]) * n1, array("q", [0]) * n1
+    ack_perf_ns, ack_wall_ns = array("q", [0]) * n1, array("q", [0]) * n1
+    state = bytearray(n1)
 
     def finalize(seq, outcome):
-        if seq in finalized: return
-        row = {
-            "seq": seq,
-            "send_ts": f"{send_wall.get(seq,0):.6f}" if seq in send_wall else "",
-            "ack_ts": f"{ack_wall.get(seq,0):.6f}" if outcome=="ACKED" and seq in ack_wall else "",
-            "rtt_ms": "",
-            "outcome": outcome
-        }
-        if outcome=="ACKED" and seq in send_perf and seq in ack_perf:
-            row["rtt_ms"]=f"{(ack_perf[seq]-send_perf[seq])*1000:.3f}"
-        writer.writerow(row)
-        finalized.add(seq)
-
-    for seq in range(1, args.n + 1):
-        if seq in seen_seqs:
-            raise RuntimeError(f"Duplicate seq {seq}")
-        seen_seqs.add(seq)
-
-        payload = {"seq": seq, "send_ts": time.time(), "msg": f"Hello {seq}"}
-        data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
-        send_perf[seq]=now_perf(); send_wall[seq]=payload["send_ts"]
-        sock.sendto(data,(args.host,args.port))
-        sent_count+=1
-        if args.verbose: print(f"[CLIENT] Sent seq={seq}")
-
-        deadline=now_perf()+args.timeout; got_current=False
-        while True:
-            remaining=deadline-now_perf()
-            if remaining<=0: break
-            sock.settimeout(remaining)
-            try:
-                rx,_=sock.recvfrom(65535)
-                t_perf,t_wall=now_perf(),time.time()
-                ack=json.loads(rx.decode("utf-8",errors="strict"))
-                s=int(ack.get("seq"))
-
-                # First observation of ACK for seq s → store times and print RTT immediately
-                if s not in ack_perf:
-                    ack_perf[s],ack_wall[s]=t_perf,t_wall
-                    if s in send_perf and args.verbose:
-                        rtt_ms = (t_perf - send_perf[s]) * 1000.0
-                        print(f"[CLIENT] ACKED seq={s} RTT={rtt_ms:.3f} ms")
-
-                # If this ACK is for the current seq, finalize now
-                if s==seq and seq not in finalized:
-                    ack_count+=1; finalize(seq,"ACKED"); got_current=True; break
-            except socket.timeout:
-                break
-            except Exception as e:
-                if args.verbose: print(f"[CLIENT] RX error: {e}")
-
-        # If current seq wasn’t ACKed in time, either it was ACKed earlier (OOO) or it timed out
-        if not got_current and seq not in finalized:
-            if seq in ack_perf:
-                ack_count+=1; finalize(seq,"ACKED")
-            else:
-                finalize(seq,"TIMEOUT")
-                if args.verbose:
-                    print(f"[CLIENT] TIMEOUT seq={seq}")
-
-        jitter_sleep(args.interval,args.jitter)
-
-    f.flush(); f.close()
-
-    # RTT stats
-    rtts=[]
-    with open(args.log_csv,"r",encoding="utf-8") as rf:
-        for row in csv.DictReader(rf):
-            if row["outcome"]=="ACKED" and row["rtt_ms"]:
-                try: rtts.append(float(row["rtt_ms"]))
-                except ValueError: pass
+        st = state[seq]
+        if st & FINALIZED: return
+        acked = outcome=="ACKED" and st & ACKED
+        rtt_ok = acked and st & SEEN
+        # Positional row in `fields` order
+        writer.writerow((
+            seq,
+            fmt_wall_ns(send_wall_ns[seq]) if st & SEEN else "",
+            fmt_wall_ns(ack_wall_ns[seq]) if acked else "",
+            f"{(ack_perf_ns[seq]-send_perf_ns[seq])/1e6:.3f}" if rtt_ok else "",
+            outcome
+        ))
+        state[seq] = st | FINALIZED | (LOGGED_ACKED if rtt_ok else 0)
+
+    # Rows are streamed by finalize(); closing in `finally` keeps the rows logged so far
+    # even when the run is interrupted.
+    try:
+        for seq in range(1, args.n + 1):
+            if state[seq] & SEEN:
+                raise RuntimeError(f"Duplicate seq {seq}")
+            state[seq] |= SEEN
+
+            wall_ns = time.time_ns()
+            wall_sec, wall_nsec = divmod(wall_ns, 1_000_000_000)
+            data = MSG_FMT % (seq, wall_sec, wall_nsec, seq)
+            send_perf_ns[seq]=now_perf_ns(); send_wall_ns[seq]=wall_ns
+            sock.sendto(data,(args.host,args.port))
+            sent_count+=1
+            if args.verbose: print(f"[CLIENT] Sent seq={seq}")
+
+            deadline=now_perf_ns()+int(args.timeout*1e9); got_current=False
+            while True:
+                remaining=deadline-now_perf_ns()
+                if remaining<=0: break
+                sock.settimeout(remaining/1e9)
+                try:
+                    rx,_=sock.recvfrom(65535)
+                    t_perf,t_wall=now_perf_ns(),time.time_ns()
+                    ack=json.loads(rx.decode("utf-8",errors="strict"))
+                    s=int(ack.get("seq"))
+
+                    # Ignore ACKs for seqs this run never sent (no slot in the per-seq arrays)
+                    if not 0 < s < n1:
+                        continue
+                    # First observation of ACK for seq s → store times and print RTT immediately
+                    if not state[s] & ACKED:
+                        ack_perf_ns[s],ack_wall_ns[s]=t_perf,t_wall
+                        state[s] |= ACKED
+                        if state[s] & SEEN and args.verbose:
+                            rtt_ms = (t_perf - send_perf_ns[s]) / 1e6
+                            print(f"[CLIENT] ACKED seq={s} RTT={rtt_ms:.3f} ms")
+
+                    # If this ACK is for the current seq, finalize now
+                    if s==seq and not state[seq] & FINALIZED:
+                        ack_count+=1; finalize(seq,"ACKED"); got_current=True; break
+                except socket.timeout:
+                    break
+                except Exception as e:
+                    if args.verbose: print(f"[CLIENT] RX error: {e}")
+
+            # If current seq wasn’t ACKed in time, either it was ACKed earlier (OOO) or it timed out
+            if not got_current and not state[seq] & FINALIZED:
+                if state[seq] & ACKED:
+                    ack_count+=1; finalize(seq,"ACKED")
+                else:
+                    finalize(seq,"TIMEOUT")
+                    if args.verbose:
+                        print(f"[CLIENT] TIMEOUT seq={seq}")
+
+            jitter_sleep(args.interval,args.jitter)
+    finally:
+        f.close()
+
+    # RTT stats straight from the arrays, no need to re-read the CSV
+    rtts=[(ack_perf_ns[seq]-send_perf_ns[seq])/1e6 for seq in range(1,n1) if state[seq] & LOGGED_ACKED]
 
     loss=(sent_count-ack_count)/sent_count if sent_count else 0
     summary={
         "sent":sent_count,"acked":ack_count,
         "loss_ratio":round(loss,2),"seed":args.seed,
         "rtt_ms":{
-            "avg":round(statistics.mean(rtts),3) if rtts else None,
+            "avg":round(sum(rtts)/len(rtts),3) if rtts else None,
             "min":round(min(rtts),3) if rtts else None,
             "max":round(max(rtts),3) if rtts else None
         }
@@ -2,53 +2,87 @@
 """
 TCP Server (Assignment Part B — Timing & Latency Study)
 - Runs on the school's Linux server, listening on the assigned TCP port.
-- Accepts a single client connection at a time (serially).
-- Receives line-delimited JSON messages:
+- Serves client connections concurrently with asyncio, so one connection's
+  artificial delay never stalls another.
+- Receives line-delimited JSON messages (raw bytes split on b"\n", no text layer):
     {"seq": <int>, "send_ts": <float>, "msg": "Hello <seq>"}
 - Waits an artificial delay (default 50 ms) before sending an ACK line:
     {"seq": <int>, "server_recv_ts": <float>}
 - Prints connection establishment and closure messages.
 """
-import argparse, json, socket, time
+import argparse, asyncio, json, socket, time
 
-def handle_connection(conn, addr, delay_ms, verbose):
+async def handle_connection(reader, writer, delay_ms, verbose):
+    addr = writer.get_extra_info("peername")
+    # Small ACK lines must go out immediately; Nagle would inflate the RTTs
+    sock = writer.get_extra_info("socket")
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     if verbose:
         print(f"[TCP] Connected: {addr}")
-    rfile = conn.makefile("r", encoding="utf-8", newline="\n")
-    wfile = conn.makefile("w", encoding="utf-8", newline="\n")
+    buf = bytearray()
     try:
-        for line in rfile:
-            line = line.strip()
-            if not line:
-                continue
+        while True:
+            chunk = await reader.read(4096)
+            if not chunk:
+                if not buf:
+                    break
+                chunk = b"\n"  # EOF: terminate a last line sent without a newline
+            buf.extend(chunk)
+
+            # Every complete line in the buffer arrived in this read: parse them all,
+            # then wait the delay once and send their ACKs in a single write
             recv_ts = time.time()
-            try:
-                payload = json.loads(line)
-                seq = int(payload.get("seq"))
-            except Exception:
-                # Ignore malformed input lines
+            acks, seqs = [], []
+            start = 0
+            while (nl := buf.find(b"\n", start)) >= 0:
+                line = bytes(buf[start:nl]).strip()
+                start = nl + 1
+                if not line:
+                    continue
+                try:
+                    payload = json.loads(line)
+                    seq = int(payload.get("seq"))
+                except Exception:
+                    # Ignore malformed input lines
+                    continue
+                ack = {"seq": seq, "server_recv_ts": recv_ts}
+                acks.append(json.dumps(ack, separators=(",", ":")).encode("utf-8") + b"\n")
+                seqs.append(seq)
+            del buf[:start]
+            if not acks:
                 continue
 
             if delay_ms > 0:
-                time.sleep(delay_ms / 1000.0)
+                # Yields to the event loop, other connections keep being served meanwhile
+                await asyncio.sleep(delay_ms / 1000.0)
 
-            ack = {"seq": seq, "server_recv_ts": recv_ts}
-            wfile.write(json.dumps(ack, separators=(",", ":")) + "\n")
-            wfile.flush()
+            writer.write(b"".join(acks))
+            await writer.drain()
 
             if verbose:
-                print(f"[TCP] ACK seq={seq} to {addr}")
+                for seq in seqs:
+                    print(f"[TCP] ACK seq={seq} to {addr}")
+    except ConnectionError:
+        # Client went away mid-exchange; treat it like a normal disconnect
+        pass
     finally:
+        writer.close()
         try:
-            wfile.flush()
-        except Exception:
+            await writer.wait_closed()
+        except ConnectionError:
             pass
-        rfile.close()
-        wfile.close()
-        conn.close()
         if verbose:
             print(f"[TCP] Disconnected: {addr}")
 
+async def serve(host, port, delay_ms, verbose):
+    srv = await asyncio.start_server(
+        lambda r, w: handle_connection(r, w, delay_ms, verbose),
+        host, port, reuse_address=True)
+    if verbose:
+        print(f"[TCP] Listening on {host}:{port} (delay={delay_ms} ms)")
+    async with srv:
+        await srv.serve_forever()
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--host", default="0.0.0.0", help="Bind address (default 0.0.0.0)")
@@ -57,15 +91,7 @@ def main():
     ap.add_argument("--verbose", action="store_true", help="Verbose logging")
     args = ap.parse_args()
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as srv:
-        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        srv.bind((args.host, args.port))
-        srv.listen(1)
-        if args.verbose:
-            print(f"[TCP] Listening on {args.host}:{args.port} (delay={args.delay_ms} ms)")
-        while True:
-            conn, addr = srv.accept()
-            handle_connection(conn, addr, args.delay_ms, args.verbose)
+    asyncio.run(serve(args.host, args.port, args.delay_ms, args.verbose))
 
 if __name__ == "__main__":
     main()
@@ -11,11 +11,14 @@ TCP Client (Assignment Part B — Timing & Latency Study)
 
 import argparse
 import csv
+from array import array
 import json
 import socket
-import statistics
 import time
 
+# Outgoing line with a fixed schema: %-formatted bytes instead of a json.dumps per send
+MSG_FMT = b'{"seq":%d,"send_ts":%.6f,"msg":"Hello %d"}\n'
+
 
 def main():
     ap = argparse.ArgumentParser()
@@ -34,6 +37,9 @@ def main():
     t_ack = time.perf_counter()
     handshake_time_ms = (t_ack - t_syn) * 1000.0
 
+    # Send each small message immediately; Nagle would inflate the RTTs
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
     if args.verbose:
         print(f"[TCP] Connected to {args.host}:{args.port}")
         print(f"[TCP] Handshake time = {handshake_time_ms:.3f} ms")
@@ -41,60 +47,63 @@ def main():
     sock.settimeout(args.recv_timeout)
 
     # --- Send N messages and compute RTT ---
-    results = []
-    rtts = []
-    t_session_start = time.perf_counter()
-
-    for seq in range(1, args.n + 1):
-        send_ts = time.time()  # wall-clock timestamp for log
-        msg = {"seq": seq, "send_ts": send_ts, "msg": f"Hello {seq}"}
-        payload = json.dumps(msg) + "\n"
-
-        try:
-            t0 = time.perf_counter()
-            sock.sendall(payload.encode())
-            data = sock.recv(1024)
-            t1 = time.perf_counter()
-
-            ack = json.loads(data.decode().strip())
-            ack_ts = ack.get("server_recv_ts", time.time())
-
-            # Correct RTT using client's monotonic timer, still multiplied by 1000
-            rtt_ms = (t1 - t0) * 1000.0
-            rtts.append(rtt_ms)
-            results.append((seq, send_ts, ack_ts, rtt_ms))
-
-            if args.verbose:
-                print(f"[TCP] ACK seq={seq} RTT={rtt_ms:.3f} ms")
-
-        except socket.timeout:
-            if args.verbose:
-                print(f"[TCP] Timeout waiting for ACK for seq={seq}")
-            results.append((seq, send_ts, None, None))
-        except Exception as e:
-            print(f"[TCP] Error on seq={seq}: {e}")
-            break
-
-    t_session_end = time.perf_counter()
-    session_duration_ms = (t_session_end - t_session_start) * 1000.0
-    sock.close()
-
-    # --- Save CSV log ---
+    # Rows are written as they are produced, so memory stays flat and an
+    # interrupted run still leaves the rows logged so far.
     with open(args.log_csv, "w", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(["seq", "send_ts", "ack_ts", "rtt_ms"])
-        writer.writerows(results)
+
+        rtts = array("d")
+        t_session_start = time.perf_counter()
+
+        for seq in range(1, args.n + 1):
+            send_ts = time.time()  # wall-clock timestamp for log
+            payload = MSG_FMT % (seq, send_ts, seq)
+
+            try:
+                t0 = time.perf_counter()
+                sock.sendall(payload)
+                data = sock.recv(1024)
+                t1 = time.perf_counter()
+
+                ack = json.loads(data.decode().strip())
+                ack_ts = ack.get("server_recv_ts", time.time())
+
+                # Correct RTT using client's monotonic timer, still multiplied by 1000
+                rtt_ms = (t1 - t0) * 1000.0
+                rtts.append(rtt_ms)
+                writer.writerow((seq, send_ts, ack_ts, rtt_ms))
+
+                if args.verbose:
+                    print(f"[TCP] ACK seq={seq} RTT={rtt_ms:.3f} ms")
+
+            except socket.timeout:
+                if args.verbose:
+                    print(f"[TCP] Timeout waiting for ACK for seq={seq}")
+                writer.writerow((seq, send_ts, None, None))
+            except Exception as e:
+                print(f"[TCP] Error on seq={seq}: {e}")
+                break
+
+        t_session_end = time.perf_counter()
+
+    session_duration_ms = (t_session_end - t_session_start) * 1000.0
+    sock.close()
 
     # --- Compute summary ---
     if rtts:
+        # Builtin reductions straight over the array; one sort for the median
+        ordered = sorted(rtts)
+        mid = len(ordered) // 2
+        median = ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
         summary = {
             "sent": args.n,
             "acked": len(rtts),
             "rtt_ms": {
-                "avg": round(statistics.mean(rtts), 3),
-                "min": round(min(rtts), 3),
-                "max": round(max(rtts), 3),
-                "median": round(statistics.median(rtts), 3)
+                "avg": round(sum(rtts) / len(rtts), 3),
+                "min": round(ordered[0], 3),
+                "max": round(ordered[-1], 3),
+                "median": round(median, 3)
             },
             "handshake_ms": round(handshake_time_ms, 3),
             "session_duration_ms": round(session_duration_ms, 3)
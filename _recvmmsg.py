@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+recvmmsg(2)/sendmmsg(2) shim for the UDP server (ctypes only, no extra packages).
+- RecvBatch drains up to `batch` datagrams per syscall into buffers that are
+  allocated once and reused for every call.
+- SendBatch queues replies to received datagrams and sends them with one
+  sendmmsg call per flush.
+- Received datagrams stay in the receiver's bytearray `buf`; datagram i is
+  buf[i * slot : i * slot + length(i)], so callers can parse it without a copy.
+- RecvBatch slots hold SLOT (64 KB) bytes, enough for any UDP datagram, so nothing
+  is truncated; the whole batch buffer (4 MB at batch=64) is allocated once.
+- stamp(i) gives datagram i's receive time as (sec, nsec). RecvBatch reads the
+  kernel's SO_TIMESTAMPNS stamp, so Python scheduling delay is not included.
+- RecvFallback/SendFallback keep the same interface on top of sock.recvfrom_into /
+  sock.sendto (one datagram per call) for platforms without the mmsg calls.
+- open_receiver()/open_sender() pick whichever one this platform supports.
+"""
+import ctypes, errno, os, platform, socket, time
+
+MSG_WAITFORONE = 0x10000  # return as soon as one datagram is in, don't wait for a full batch
+SLOT = 65535              # per-datagram buffer; holds the largest UDP payload
+ACK_SLOT = 256            # per-reply buffer; ACKs are well under this
+SEND_BATCH = 100          # sendmmsg gains flatten out past ~100 messages per call
+SO_TIMESTAMPNS = getattr(socket, "SO_TIMESTAMPNS", 35)  # also the SCM type of the stamp
+
+
+class iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class sockaddr_in(ctypes.Structure):
+    _fields_ = [("sin_family", ctypes.c_ushort), ("sin_port", ctypes.c_uint16),
+                ("sin_addr", ctypes.c_ubyte * 4), ("sin_zero", ctypes.c_char * 8)]
+
+
+class msghdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p), ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(iovec)), ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p), ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+
+class cmsg_timespec(ctypes.Structure):
+    """cmsghdr followed by the struct timespec payload of SCM_TIMESTAMPNS."""
+    _fields_ = [("cmsg_len", ctypes.c_size_t), ("cmsg_level", ctypes.c_int),
+                ("cmsg_type", ctypes.c_int), ("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+class mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", msghdr), ("msg_len", ctypes.c_uint)]
+
+
+_libc = None
+if platform.system() == "Linux":
+    try:
+        _libc = ctypes.CDLL("libc.so.6", use_errno=True)
+        _libc.recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(mmsghdr), ctypes.c_uint,
+                                   ctypes.c_int, ctypes.c_void_p]
+        _libc.recvmmsg.restype = ctypes.c_int
+        _libc.sendmmsg.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+        _libc.sendmmsg.restype = ctypes.c_int
+    except (OSError, AttributeError):
+        _libc = None
+
+AVAILABLE = _libc is not None
+
+
+class RecvBatch:
+    """Fixed mmsghdr/iovec/sockaddr_in/cmsg/buffer arrays filled by one recvmmsg call."""
+
+    def __init__(self, sock, batch=64):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, SO_TIMESTAMPNS, 1)
+        except OSError:
+            pass  # stamp() falls back to the time recv() returned
+        self.fd = sock.fileno()
+        self.batch = batch
+        self.slot = SLOT
+        self.buf = bytearray(batch * SLOT)
+        self._raw = (ctypes.c_char * len(self.buf)).from_buffer(self.buf)
+        self._names = (sockaddr_in * batch)()
+        self._iovs = (iovec * batch)()
+        self._cmsgs = (cmsg_timespec * batch)()
+        self._hdrs = (mmsghdr * batch)()
+        self._last = batch
+        self._now = (0, 0)
+        base = ctypes.addressof(self._raw)
+        for i in range(batch):
+            self._iovs[i].iov_base = base + i * SLOT
+            self._iovs[i].iov_len = SLOT
+            hdr = self._hdrs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._names[i])
+            hdr.msg_iov = ctypes.pointer(self._iovs[i])
+            hdr.msg_iovlen = 1
+            hdr.msg_control = ctypes.addressof(self._cmsgs[i])
+
+    def recv(self):
+        """Block until at least one datagram arrives; return how many were stored."""
+        # The kernel overwrites msg_namelen/msg_controllen with the real lengths,
+        # reset the slots it used
+        namelen = ctypes.sizeof(sockaddr_in)
+        controllen = ctypes.sizeof(cmsg_timespec)
+        hdrs = self._hdrs
+        for i in range(self._last):
+            hdr = hdrs[i].msg_hdr
+            hdr.msg_namelen = namelen
+            hdr.msg_controllen = controllen
+        n = _libc.recvmmsg(self.fd, hdrs, self.batch, MSG_WAITFORONE, None)
+        self._now = divmod(time.time_ns(), 1_000_000_000)
+        if n < 0:
+            err = ctypes.get_errno()
+            self._last = 0
+            if err == errno.EINTR:
+                return 0
+            raise OSError(err, os.strerror(err))
+        self._last = n
+        return n
+
+    def length(self, i):
+        return self._hdrs[i].msg_len
+
+    def stamp(self, i):
+        """Kernel receive time of datagram i as (sec, nsec), else when recv() returned."""
+        if self._hdrs[i].msg_hdr.msg_controllen:
+            c = self._cmsgs[i]
+            if c.cmsg_level == socket.SOL_SOCKET and c.cmsg_type == SO_TIMESTAMPNS:
+                return c.tv_sec, c.tv_nsec
+        return self._now
+
+    def addr(self, i):
+        name = self._names[i]
+        return socket.inet_ntoa(bytes(name.sin_addr)), socket.ntohs(name.sin_port)
+
+
+class SendBatch:
+    """Queue of replies sent with sendmmsg; addresses are copied from a RecvBatch slot."""
+
+    def __init__(self, sock, batch=SEND_BATCH):
+        self.fd = sock.fileno()
+        self.batch = batch
+        self.n = 0
+        self._bufs = (ctypes.c_char * (batch * ACK_SLOT))()
+        self._names = (sockaddr_in * batch)()
+        self._iovs = (iovec * batch)()
+        self._hdrs = (mmsghdr * batch)()
+        base = ctypes.addressof(self._bufs)
+        for i in range(batch):
+            self._iovs[i].iov_base = base + i * ACK_SLOT
+            hdr = self._hdrs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self._names[i])
+            hdr.msg_namelen = ctypes.sizeof(sockaddr_in)
+            hdr.msg_iov = ctypes.pointer(self._iovs[i])
+            hdr.msg_iovlen = 1
+
+    def add(self, rx, i, data):
+        """Queue `data` as a reply to datagram i of the last rx.recv()."""
+        j = self.n
+        self._names[j] = rx._names[i]
+        ctypes.memmove(self._iovs[j].iov_base, data, len(data))
+        self._iovs[j].iov_len = len(data)
+        self.n = j + 1
+        if self.n == self.batch:
+            self.flush()
+
+    def flush(self):
+        sent, n = 0, self.n
+        base, size = ctypes.addressof(self._hdrs), ctypes.sizeof(mmsghdr)
+        while sent < n:
+            r = _libc.sendmmsg(self.fd, base + sent * size, n - sent, 0)
+            if r < 0:
+                err = ctypes.get_errno()
+                if err == errno.EINTR:
+                    continue
+                self.n = 0
+                raise OSError(err, os.strerror(err))
+            sent += r
+        self.n = 0
+
+
+class RecvFallback:
+    """Same interface as RecvBatch, one recvfrom_into per call."""
+
+    def __init__(self, sock, batch=64):
+        self.sock = sock
+        self.slot = 0
+        self.buf = bytearray(65535)
+        self._len, self._addr = 0, None
+        self._now = (0, 0)
+
+    def recv(self):
+        self._len, self._addr = self.sock.recvfrom_into(self.buf)
+        self._now = divmod(time.time_ns(), 1_000_000_000)
+        return 1
+
+    def length(self, i):
+        return self._len
+
+    def stamp(self, i):
+        return self._now
+
+    def addr(self, i):
+        return self._addr
+
+
+class SendFallback:
+    """Same interface as SendBatch, one sendto per reply."""
+
+    def __init__(self, sock, batch=SEND_BATCH):
+        self.sock = sock
+
+    def add(self, rx, i, data):
+        self.sock.sendto(data, rx.addr(i))
+
+    def flush(self):
+        pass
+
+
+def open_receiver(sock, batch=64):
+    return RecvBatch(sock, batch) if AVAILABLE else RecvFallback(sock, batch)
+
+
+def open_sender(sock, batch=SEND_BATCH):
+    return SendBatch(sock, batch) if AVAILABLE else SendFallback(sock, batch)